@@ -1,84 +1,94 @@
 
-
-from moebot_client import MoeBotClient as MoeBot
-
+import argparse
+import functools
 import logging
 import os
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
-
-# Suppress pymoebot and tinytuya debug/info logging during startup
-logging.getLogger("pymoebot").setLevel(logging.CRITICAL)
-logging.getLogger("tinytuya").setLevel(logging.CRITICAL)
-logging.getLogger("moebot_client").setLevel(logging.INFO)
+import sys
+from dataclasses import dataclass
 
-# Configure logging
-logging.basicConfig(
-    format='%(asctime)s %(levelname)s [%(name)s] %(message)s',
-    level=logging.INFO
-)
-
-# MoeBot Configuration
-DEVICE_ID = os.getenv("DEVICE_ID")
-DEVICE_IP = os.getenv("DEVICE_IP")
-LOCAL_KEY = os.getenv("LOCAL_KEY")
-
-# MQTT Configuration
-MQTT_HOST = os.getenv("MQTT_HOST")
-# Default to 1883 if not specified
-MQTT_PORT = int(os.getenv("MQTT_PORT", 1883))
-MQTT_USERNAME = os.getenv("MQTT_USERNAME")
-MQTT_PASSWORD = os.getenv("MQTT_PASSWORD")
-MQTT_TOPIC = os.getenv("MQTT_TOPIC", "moebot")
+@dataclass(frozen=True, slots=True)
+class Config:
+    """Bridge configuration read from the environment / .env file"""
+    # MoeBot Configuration
+    device_id: str | None
+    device_ip: str | None
+    local_key: str | None
+    
+    # MQTT Configuration
+    mqtt_host: str | None
+    mqtt_port: int
+    mqtt_username: str | None
+    mqtt_password: str | None
+    mqtt_topic: str
+    mqtt_per_field_topics: bool
 
-if not all([DEVICE_ID, DEVICE_IP, LOCAL_KEY, MQTT_HOST]):
-    logging.warning("Missing configuration! Please copy .env.example to .env and fill in your details.")
+@functools.cache
+def _config() -> Config:
+    """Load environment variables once and return the resulting configuration"""
+    from dotenv import load_dotenv
+    load_dotenv()
+    
+    config = Config(
+        device_id=os.getenv("DEVICE_ID"),
+        device_ip=os.getenv("DEVICE_IP"),
+        local_key=os.getenv("LOCAL_KEY"),
+        mqtt_host=os.getenv("MQTT_HOST"),
+        # Default to 1883 if not specified
+        mqtt_port=int(os.getenv("MQTT_PORT", 1883)),
+        mqtt_username=os.getenv("MQTT_USERNAME"),
+        mqtt_password=os.getenv("MQTT_PASSWORD"),
+        mqtt_topic=os.getenv("MQTT_TOPIC", "moebot"),
+        mqtt_per_field_topics=os.getenv("MQTT_PER_FIELD_TOPICS", "true").lower() not in ("false", "0", "off", "no"),
+    )
+    
+    if not (config.device_id and config.device_ip and config.local_key and config.mqtt_host):
+        logging.warning("Missing configuration! Please copy .env.example to .env and fill in your details.")
+    
+    return config
 
 def query_status():
     """Query the MoeBot's current status (polling method)"""
+    # Deferred so usage errors don't pay for importing pymoebot/tinytuya
+    from moebot_client import MoeBotClient as MoeBot
+    
+    cfg = _config()
     try:
-        moebot = MoeBot(DEVICE_ID, DEVICE_IP, LOCAL_KEY)
+        moebot = MoeBot(cfg.device_id, cfg.device_ip, cfg.local_key)
         moebot.poll()
         
-        print("=" * 50)
-        print("MoeBot Status (Polling)")
-        print("=" * 50)
-        print(f"Device Online: {moebot.online}")
-        print(f"Battery level: {moebot.battery}%")
-        print(f"Machine state: {moebot.state}")
-        print(f"Emergency State: {moebot.emergency_state}")
-        print(f"Mow In Rain: {moebot.mow_in_rain}")
-        print(f"Mow Time: {moebot.mow_time} hours")
-        print(f"Work Mode: {moebot.work_mode}")
-        print(f"Last update: {moebot.last_update}")
+        # Read every field once, then build the whole report and emit it with a single write
+        snap = moebot.get_snapshot()
+        buf = []
+        append = buf.append
+        append("=" * 50)
+        append("MoeBot Status (Polling)")
+        append("=" * 50)
+        append(f"Device Online: {snap.online}")
+        append(f"Battery level: {snap.battery}%")
+        append(f"Machine state: {snap.state}")
+        append(f"Emergency State: {snap.emergency_state}")
+        append(f"Mow In Rain: {snap.mow_in_rain}")
+        append(f"Mow Time: {snap.mow_time} hours")
+        append(f"Work Mode: {snap.work_mode}")
+        append(f"Last update: {snap.last_update}")
         
         # New Extended Features
-        print("-" * 50)
-        print(f"Device Password: {moebot.password}")
-        print(f"Active Errors: {moebot.machine_errors}")
-        print("-" * 50)
+        append("-" * 50)
+        append(f"Device Password: {snap.password}")
+        # Printed as a list, as before the decoders started returning (cacheable) tuples
+        append(f"Active Errors: {list(snap.machine_errors)}")
+        append("-" * 50)
         
         # Decode and print zone information
-        print("\nZone Configuration:")
-        zones = moebot.zones
-        if zones:
-            distance1, ratio1 = zones.zone1
-            distance2, ratio2 = zones.zone2
-            distance3, ratio3 = zones.zone3
-            distance4, ratio4 = zones.zone4
-            distance5, ratio5 = zones.zone5
-            
-            print(f"  Zone 1: Distance={distance1}, Ratio={ratio1}%")
-            print(f"  Zone 2: Distance={distance2}, Ratio={ratio2}%")
-            print(f"  Zone 3: Distance={distance3}, Ratio={ratio3}%")
-            print(f"  Zone 4: Distance={distance4}, Ratio={ratio4}%")
-            print(f"  Zone 5: Distance={distance5}, Ratio={ratio5}%")
+        append("\nZone Configuration:")
+        if snap.zones:
+            for i, (distance, ratio) in enumerate(snap.zones, 1):
+                append(f"  Zone {i}: Distance={distance}, Ratio={ratio}%")
         else:
-            print("  No zone configuration available")
+            append("  No zone configuration available")
         
-        print("=" * 50)
+        append("=" * 50)
+        sys.stdout.write("\n".join(buf) + "\n")
         
     except Exception as e:
         print(f"Error querying device: {e}")
@@ -89,8 +99,11 @@ def listener(msg):
 
 def listen_for_updates():
     """Listen for real-time updates from the MoeBot"""
+    from moebot_client import MoeBotClient as MoeBot
+    
+    cfg = _config()
     try:
-        moebot = MoeBot(DEVICE_ID, DEVICE_IP, LOCAL_KEY)
+        moebot = MoeBot(cfg.device_id, cfg.device_ip, cfg.local_key)
         moebot.add_listener(listener)
         
         print("=" * 50)
@@ -106,47 +119,76 @@ def listen_for_updates():
     except Exception as e:
         print(f"Error listening to device: {e}")
 
-if __name__ == "__main__":
-    import sys
+def run_mqtt_bridge():
+    """Run the MQTT bridge until SIGINT/SIGTERM"""
+    from mqtt_handler import MoeBotMQTT
+    cfg = _config()
+    mqtt_bridge = MoeBotMQTT(
+        device_id=cfg.device_id,
+        device_ip=cfg.device_ip,
+        local_key=cfg.local_key,
+        mqtt_host=cfg.mqtt_host,
+        mqtt_port=cfg.mqtt_port,
+        mqtt_username=cfg.mqtt_username if cfg.mqtt_username else None,
+        mqtt_password=cfg.mqtt_password if cfg.mqtt_password else None,
+        mqtt_topic=cfg.mqtt_topic,
+        per_field_topics=cfg.mqtt_per_field_topics
+    )
     
-    if len(sys.argv) > 1:
-        mode = sys.argv[1].lower()
+    try:
+        mqtt_bridge.start()
+        print("\n" + "=" * 50)
+        print("MQTT Bridge Active")
+        print("=" * 50)
         
-        if mode == "listen":
-            listen_for_updates()
-        elif mode == "mqtt":
-            # Start MQTT bridge
-            from mqtt_handler import MoeBotMQTT
-            mqtt_bridge = MoeBotMQTT(
-                device_id=DEVICE_ID,
-                device_ip=DEVICE_IP,
-                local_key=LOCAL_KEY,
-                mqtt_host=MQTT_HOST,
-                mqtt_port=MQTT_PORT,
-                mqtt_username=MQTT_USERNAME if MQTT_USERNAME else None,
-                mqtt_password=MQTT_PASSWORD if MQTT_PASSWORD else None,
-                mqtt_topic=MQTT_TOPIC
-            )
+        # Keep running - park the main thread until SIGINT/SIGTERM instead of polling
+        import signal
+        import threading
+        stop_event = threading.Event()
+        signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+        signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+        stop_event.wait()
+        # A second Ctrl+C/SIGTERM must still be able to interrupt a stop() that hangs
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
             
-            try:
-                mqtt_bridge.start()
-                print("\n" + "=" * 50)
-                print("MQTT Bridge Active")
-                print("=" * 50)
-                
-                # Keep running
-                import time
-                while True:
-                    time.sleep(1)
-                    
-            except KeyboardInterrupt:
-                print("\nShutting down MQTT bridge...")
-                mqtt_bridge.stop()
-        else:
-            print(f"Unknown mode: {mode}")
-            print("Usage: python main.py [listen|mqtt]")
-            print("  - No argument: Query device status once")
-            print("  - listen: Listen for real-time updates")
-            print("  - mqtt: Start MQTT bridge")
-    else:
-        query_status()
+    except KeyboardInterrupt:
+        pass
+    print("\nShutting down MQTT bridge...")
+    mqtt_bridge.stop()
+
+MODES = {
+    "status": query_status,
+    "listen": listen_for_updates,
+    "mqtt": run_mqtt_bridge,
+}
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="MoeBot status tool and MQTT bridge")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="don't configure log output (only warnings and errors are shown)")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="log debug output from the bridge and client")
+    subparsers = parser.add_subparsers(dest="mode", metavar="{status,listen,mqtt}")
+    subparsers.add_parser("status", help="query device status once (default)")
+    subparsers.add_parser("listen", help="listen for real-time updates")
+    subparsers.add_parser("mqtt", help="start MQTT bridge")
+    args = parser.parse_args(argv)
+    
+    # Suppress pymoebot and tinytuya debug/info logging during startup
+    logging.getLogger("pymoebot").setLevel(logging.CRITICAL)
+    logging.getLogger("tinytuya").setLevel(logging.CRITICAL)
+    logging.getLogger("moebot_client").setLevel(logging.DEBUG if args.verbose else logging.INFO)
+    
+    # Configure logging
+    if not args.quiet:
+        logging.basicConfig(
+            format='%(asctime)s %(levelname)s [%(name)s] %(message)s',
+            level=logging.DEBUG if args.verbose else logging.INFO
+        )
+    
+    MODES[args.mode or "status"]()
+
+if __name__ == "__main__":
+    main()
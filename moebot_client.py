@@ -1,11 +1,47 @@
 
 from pymoebot import MoeBot as PyMoeBot
 import tinytuya
+import functools
 import logging
-from typing import Dict, List, Tuple
+import operator
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
 
 _log = logging.getLogger("moebot_client")
 
+# Name-mangled private attributes of pymoebot.MoeBot that the client reaches into
+_DEVICE_ATTR = "_MoeBot__device"
+_PARSE_ATTR = "_MoeBot__parse_payload"
+_THREAD_ATTR = "_MoeBot__thread"
+
+# Zone properties exposed by pymoebot's ZoneConfig, in zone order
+_ZONE_ATTRS = ("zone1", "zone2", "zone3", "zone4", "zone5")
+# Reads all of them in one call, returning a tuple in the same order
+_ZONE_GETTER = operator.attrgetter(*_ZONE_ATTRS)
+
+def _protocol_cache_file() -> Path:
+    """File holding the protocol version that last worked, tried first on the next start-up"""
+    # Resolved on use: Path.home() raises RuntimeError when no home directory can be determined
+    return Path.home() / ".cache" / "moebot" / "proto_version"
+
+def _load_cached_version() -> Optional[float]:
+    """Read the last working protocol version, if any"""
+    try:
+        return float(_protocol_cache_file().read_text().strip())
+    except (OSError, RuntimeError, ValueError):
+        return None
+
+def _save_cached_version(version: float) -> None:
+    """Remember the working protocol version (best effort)"""
+    try:
+        cache_file = _protocol_cache_file()
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        cache_file.write_text(f"{version}\n")
+    except (OSError, RuntimeError) as e:
+        _log.debug(f"Could not cache protocol version: {e}")
+
 class PasswordDecoder:
     """Decode device PIN from numeric to letter format"""
     
@@ -16,6 +52,7 @@ class PasswordDecoder:
         '3': 'C',
         '4': 'D'
     }
+    _TRANSLATION = str.maketrans(DIGIT_TO_LETTER)
     
     @staticmethod
     def decode(password_value: int) -> str:
@@ -23,69 +60,94 @@ class PasswordDecoder:
             return ""
         
         try:
-            password_str = str(password_value)
-            decoded = ""
-            
-            for digit in password_str:
-                if digit in PasswordDecoder.DIGIT_TO_LETTER:
-                    decoded += PasswordDecoder.DIGIT_TO_LETTER[digit]
-                else:
-                    decoded += digit
-            
-            return decoded
+            return PasswordDecoder._translate(str(password_value))
         except (ValueError, TypeError):
             return ""
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=64)
+    def _translate(digits: str) -> str:
+        # Memoized on the validated str, so any raw value type is safe to pass to decode()
+        return digits.translate(PasswordDecoder._TRANSLATION)
 
 class ErrorDecoder:
     """Decode MachineError bitmap (DPS 102) into individual error flags"""
     
-    ERROR_CODES = {
-        0: "FAULT_LEAN",
-        1: "FAULT_TOO_STEEP",
-        2: "NO_SIGNAL",
-        3: "L_MOTOR_ERROR",
-        4: "R_MOTOR_ERROR",
-        5: "BATTERY_VOL_HIGH",
-        6: "CHARGE_OVERCURRENT",
-        7: "CHARGE_OVERVOLTAGE",
-        8: "CHARGE_OVERTEMP",
-        9: "BATTERY_DAMAGE",
-        10: "BATTERY_LOW",
-        11: "DISCHARGE_CURRENT",
-        12: "DISCHARGE_TEMP",
-        13: "UNEXPECTED_LOW",
-        14: "EXPECTED_ERROR",
-        15: "IMU_INVALID",
-        16: "EMS_INVALID",
-        17: "RAIN_INVALID",
-        18: "HALL_INVALID",
-        19: "STEEP_OVER_3S",
-        20: "OUTSIDE_AREA",
-        21: "LIFTED",
-        22: "TRAPPED",
-        23: "B_MOTOR_ERROR",
-        24: "OVERTURN",
-        25: "MOTOR_OVERCURRENT",
-        26: "MOTOR_HALL",
-        27: "MOTOR_DISCONNECT",
-        28: "EMS_DISCONNECT",
-        29: "MOTOR_ERROR"
-    }
+    # Error name for each bit position (index == bit)
+    ERROR_NAMES = (
+        "FAULT_LEAN",  # bit 0
+        "FAULT_TOO_STEEP",
+        "NO_SIGNAL",
+        "L_MOTOR_ERROR",
+        "R_MOTOR_ERROR",
+        "BATTERY_VOL_HIGH",  # bit 5
+        "CHARGE_OVERCURRENT",
+        "CHARGE_OVERVOLTAGE",
+        "CHARGE_OVERTEMP",
+        "BATTERY_DAMAGE",
+        "BATTERY_LOW",  # bit 10
+        "DISCHARGE_CURRENT",
+        "DISCHARGE_TEMP",
+        "UNEXPECTED_LOW",
+        "EXPECTED_ERROR",
+        "IMU_INVALID",  # bit 15
+        "EMS_INVALID",
+        "RAIN_INVALID",
+        "HALL_INVALID",
+        "STEEP_OVER_3S",
+        "OUTSIDE_AREA",  # bit 20
+        "LIFTED",
+        "TRAPPED",
+        "B_MOTOR_ERROR",
+        "OVERTURN",
+        "MOTOR_OVERCURRENT",  # bit 25
+        "MOTOR_HALL",
+        "MOTOR_DISCONNECT",
+        "EMS_DISCONNECT",
+        "MOTOR_ERROR"
+    )
     
     @staticmethod
-    def decode(error_value: int) -> List[str]:
+    def decode(error_value: int) -> Tuple[str, ...]:
         if not isinstance(error_value, int):
             try:
                 error_value = int(error_value)
             except (ValueError, TypeError):
-                return []
+                return ()
         
+        return ErrorDecoder._decode_bits(int(error_value))
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=64)
+    def _decode_bits(error_value: int) -> Tuple[str, ...]:
+        # Memoized on the validated int, so results are returned as immutable tuples
+        # Walk only the set bits (lowest first), so a healthy 0 bitmap skips the loop entirely
         active_errors = []
-        for bit_position, error_name in ErrorDecoder.ERROR_CODES.items():
-            if error_value & (1 << bit_position):
-                active_errors.append(error_name)
-        
-        return active_errors
+        remaining = error_value
+        while remaining > 0:
+            lowest_bit = remaining & -remaining
+            bit_position = lowest_bit.bit_length() - 1
+            if bit_position < len(ErrorDecoder.ERROR_NAMES):
+                active_errors.append(ErrorDecoder.ERROR_NAMES[bit_position])
+            remaining ^= lowest_bit
+
+        return tuple(active_errors)
+
+@dataclass(frozen=True, slots=True)
+class StatusSnapshot:
+    """Point-in-time copy of the device state, shared by the CLI report and the MQTT bridge"""
+    online: bool
+    battery: Optional[int]
+    state: Optional[str]
+    emergency_state: Optional[str]
+    mow_in_rain: Optional[bool]
+    mow_time: Optional[int]
+    work_mode: Optional[str]
+    last_update: Optional[int]
+    # (distance, ratio) per zone, empty when the zone configuration is unknown
+    zones: Tuple[Tuple[str, str], ...]
+    machine_errors: Tuple[str, ...]
+    password: Dict[str, str]
 
 class MoeBotClient(PyMoeBot):
     """
@@ -95,17 +157,31 @@ class MoeBotClient(PyMoeBot):
     
     def __init__(self, device_id: str, device_ip: str, local_key: str) -> None:
         # Initialize connection using PyMoeBot logic first
-        # But we will override the internal device to be more robust if needed
-        super().__init__(device_id, device_ip, local_key)
+        # But we will override the internal device to be more robust if needed.
+        # With a cached version pymoebot skips its own [3.5, 3.4, 3.3] status() probe.
+        super().__init__(device_id, device_ip, local_key, tuya_version=_load_cached_version())
         
-        # Access the private device object from parent class (name mangling: _MoeBot__device)
-        self._device = getattr(self, f"_MoeBot__device") 
+        # Access the private device object and payload parser from parent class (name mangling)
+        self._device = getattr(self, _DEVICE_ATTR)
+        self._parse_payload = getattr(self, _PARSE_ATTR)
+
+        # Last raw DPS dict seen from the device, shared by the extended properties
+        self._dps_cache: Dict[str, object] = {}
+        self._dps_cache_ts: float = 0.0
+        # Local monotonic receive time of the last payload (last_update is the device's own wall-clock 't')
+        self._last_update_monotonic: Optional[float] = None
+        self.add_listener(self.__cache_dps)
         
         self.__ensure_connection()
 
     def __ensure_connection(self):
         """Try multiple protocol versions to ensure a valid connection"""
+        # Verify the version pymoebot was given; fall back to probing if the cached one no longer answers
         versions_to_try = [3.4, 3.3]
+        cached_version = _load_cached_version()
+        if cached_version in versions_to_try:
+            versions_to_try.remove(cached_version)
+            versions_to_try.insert(0, cached_version)
         connected = False
         
         for version in versions_to_try:
@@ -115,53 +191,104 @@ class MoeBotClient(PyMoeBot):
                 if 'dps' in status:
                     _log.info(f"Connected to MoeBot using protocol version {version}")
                     connected = True
-                    # Let the parent class parse this initial payload to set up state
-                    # Access private method _MoeBot__parse_payload
-                    parse_method = getattr(self, f"_MoeBot__parse_payload")
-                    parse_method(status)
+                    if version != cached_version:
+                        _save_cached_version(version)
+                    # Let the parent class parse this initial payload to set up state (also seeds the DPS cache)
+                    self._parse_payload(status)
                     break
             except Exception as e:
                 _log.debug(f"Protocol version {version} failed: {e}")
         
         if not connected:
             _log.warning("Could not establish robust connection with expected protocol versions.")
+    
+    def __cache_dps(self, data) -> None:
+        """Listener merging every parsed payload (poll or push) into the DPS cache"""
+        if isinstance(data, dict) and 'dps' in data:
+            self._dps_cache = {**self._dps_cache, **data['dps']}
+            self._dps_cache_ts = self._last_update_monotonic = time.monotonic()
+    
+    def _get_dps(self, ttl: Optional[float] = 1.0) -> Dict[str, object]:
+        """Return the cached DPS dict, querying the device only when it is older than ttl seconds (never if ttl is None)"""
+        if ttl is None or time.monotonic() - self._dps_cache_ts < ttl:
+            return self._dps_cache
+        
+        result = self._device.status()
+        if 'dps' in result:
+            self._dps_cache = result['dps']
+            self._dps_cache_ts = time.monotonic()
+        return self._dps_cache
             
     @property
-    def machine_errors(self) -> List[str]:
-        """Get decoded machine errors from DPS 102"""
-        # Rely on parent class poll() or recent status, but we can also fetch directly if needed
-        # Since pymoebot doesn't store dps 102 directly in a public prop, let's fetch from cached status or query
+    def extended_status(self) -> Dict[str, object]:
+        """Get decoded machine errors (DPS 102) and device password (DPS 106) from a single DPS read"""
+        return self._read_extended_status()
+    
+    def _read_extended_status(self, dps_ttl: Optional[float] = 1.0) -> Dict[str, object]:
+        """Decode DPS 102/106, refreshing the DPS cache first if it is older than dps_ttl (see _get_dps)"""
+        # pymoebot doesn't store these dps in public props, so read them from our short-lived DPS cache
+        errors = ()
+        password = {"numeric": None, "letter": ""}
         try:
-            # We can check the internal device dps cache if accessible, or just query status
-            # For simplicity and reliability, getting status is safest for a property access on a client
-            result = self._device.status()
-            if 'dps' in result and '102' in result['dps']:
-                return ErrorDecoder.decode(result['dps']['102'])
+            dps = self._get_dps(dps_ttl)
+            if '102' in dps:
+                errors = ErrorDecoder.decode(dps['102'])
+            if '106' in dps:
+                numeric_pw = dps['106']
+                password = {
+                    "numeric": numeric_pw,
+                    "letter": PasswordDecoder.decode(numeric_pw)
+                }
         except Exception as e:
-            _log.error(f"Error getting machine errors: {e}")
-        return []
+            _log.error(f"Error getting extended status: {e}")
+        return {"errors": errors, "password": password}
+            
+    @property
+    def machine_errors(self) -> Tuple[str, ...]:
+        """Get decoded machine errors from DPS 102"""
+        return self.extended_status["errors"]
 
     @property
     def password(self) -> Dict[str, str]:
         """Get device password (numeric and letter format) from DPS 106"""
-        try:
-            result = self._device.status()
-            if 'dps' in result and '106' in result['dps']:
-                numeric_pw = result['dps']['106']
-                return {
-                    "numeric": numeric_pw,
-                    "letter": PasswordDecoder.decode(numeric_pw)
-                }
-        except Exception as e:
-            _log.error(f"Error getting password: {e}")
-        return {"numeric": None, "letter": ""}
+        return self.extended_status["password"]
+
+    @property
+    def last_update_monotonic(self) -> Optional[float]:
+        """time.monotonic() at which the last device payload was parsed, or None before the first one"""
+        return self._last_update_monotonic
+
+    @property
+    def zone_values(self) -> Tuple[Tuple[str, str], ...]:
+        """Get the (distance, ratio) pair of each zone in order, or () when not yet known"""
+        zones = self.zones
+        if not zones:
+            return ()
+        return _ZONE_GETTER(zones)
+
+    def get_snapshot(self, dps_ttl: Optional[float] = 1.0) -> StatusSnapshot:
+        """Read every status property exactly once into an immutable snapshot (dps_ttl=None: never query the device)"""
+        extended = self._read_extended_status(dps_ttl)
+        return StatusSnapshot(
+            online=self.online,
+            battery=self.battery,
+            state=self.state,
+            emergency_state=self.emergency_state,
+            mow_in_rain=self.mow_in_rain,
+            mow_time=self.mow_time,
+            work_mode=self.work_mode,
+            last_update=self.last_update,
+            zones=self.zone_values,
+            machine_errors=extended["errors"],
+            password=extended["password"],
+        )
 
     @property
     def is_listener_alive(self) -> bool:
         """Check if the internal listener thread is alive"""
         try:
             # Access private attribute from parent class
-            thread = getattr(self, "_MoeBot__thread", None)
+            thread = getattr(self, _THREAD_ATTR, None)
             if thread and thread.is_alive():
                 return True
         except Exception:
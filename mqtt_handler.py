@@ -1,22 +1,89 @@
 """MQTT handler for MoeBot device integration"""
 
+import contextlib
 import json
 import logging
 import os
-import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import paho.mqtt.client as mqtt
+from paho.mqtt.matcher import MQTTMatcher
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.properties import Properties
 from moebot_client import MoeBotClient
 
 _log = logging.getLogger("moebot_mqtt")
 
+# Delay (seconds) used to coalesce bursts of device updates into one stats publish
+STATS_COALESCE_DELAY = 0.2
+
+# How long (seconds) the broker keeps our session - subscriptions and queued QoS 1
+# commands - after the connection drops; long enough to ride out a flapping link,
+# short enough that stale commands are not replayed much later
+MQTT_SESSION_EXPIRY = 300
+
+# Commands kept while no MoeBot is connected (oldest dropped beyond this)
+HELD_COMMANDS_MAX = 16
+
+# Time (seconds) given to the broker to send back our retained stats after connecting
+RETAINED_SEED_WINDOW = 1.0
+
+# Accepted payloads for boolean commands (payloads arrive as stripped, lowercased bytes)
+_TRUTHY = frozenset({b"true", b"1", b"on", b"yes", b"t", b"y"})
+_FALSY = frozenset({b"false", b"0", b"off", b"no", b"f", b"n"})
+
+# Published form of boolean stats (str(True).lower().encode() without the allocations)
+_BOOL_BYTES = {True: b"true", False: b"false"}
+
+# Compact JSON for the combined stats document (no padding after ',' and ':')
+_JSON_SEPARATORS = (",", ":")
+
+# (distance, ratio) stat names for each zone, in the order of MoeBotClient.zone_values
+_ZONE_STAT_NAMES = tuple((f"zone{i}_distance", f"zone{i}_ratio") for i in range(1, 6))
+
+# Every stat the bridge publishes under {stats_topic}/
+STAT_NAMES = (
+    "battery", "state", "emergency_state", "mow_in_rain", "mow_time", "work_mode", "online",
+    *(name for pair in _ZONE_STAT_NAMES for name in pair),
+    "machine_errors", "device_password", "all",
+)
+
+# Stats published without the retain flag: high-churn telemetry only. Everything else
+# (settings, zone configuration, state, errors, the combined document) stays retained.
+# The retained stats/all document carries battery too, so a battery change still costs
+# one retained write; this only stops the per-field topic from keeping a stale copy.
+_UNRETAINED = frozenset({"battery"})
+
+# Sentinel for "no value seen yet" (never equal to a real stat value)
+_UNSET = object()
+
 
 class MoeBotMQTT:
     """Bridge MoeBot to MQTT for remote control and status monitoring"""
     
+    # Fixed attribute set: smaller instances and slot-descriptor attribute access on the hot paths.
+    # Any new instance attribute must be added here.
+    __slots__ = (
+        "device_id", "device_ip", "local_key",
+        "mqtt_host", "mqtt_port", "mqtt_username", "mqtt_password", "mqtt_topic", "per_field_topics",
+        "coalesce_delay",
+        "moebot", "mqtt_client", "running",
+        "cmnd_topic", "stats_topic", "_cmnd_prefix", "_cmnd_prefix_len", "_cmnd_filter", "_stat_topics",
+        "_cmd_table", "_matcher",
+        "last_stats", "_last_values",
+        "_coalesce_lock", "_coalesce_timer", "_pending_update", "_publish_lock",
+        "_stats_filter", "_seed_timer", "_seeding", "_executor",
+        "_held_commands",
+        "_supervisor_stop_event", "_supervisor_thread",
+    )
+    
     def __init__(self, device_id: str, device_ip: str, local_key: str,
                  mqtt_host: str, mqtt_port: int = 1883,
                  mqtt_username: str = None, mqtt_password: str = None,
-                 mqtt_topic: str = "moebot"):
+                 mqtt_topic: str = "moebot", per_field_topics: bool = True,
+                 coalesce_delay: float = STATS_COALESCE_DELAY):
         """
         Initialize MQTT bridge for MoeBot
         
@@ -29,6 +96,9 @@ class MoeBotMQTT:
             mqtt_username: MQTT username (optional)
             mqtt_password: MQTT password (optional)
             mqtt_topic: Main MQTT topic (commands and stats will be subtopics)
+            per_field_topics: Also publish each changed stat on its own topic
+                (the combined JSON document on stats/all is always published)
+            coalesce_delay: Seconds to collect device updates before publishing stats
         """
         self.device_id = device_id
         self.device_ip = device_ip
@@ -39,6 +109,8 @@ class MoeBotMQTT:
         self.mqtt_username = mqtt_username
         self.mqtt_password = mqtt_password
         self.mqtt_topic = mqtt_topic
+        self.per_field_topics = per_field_topics
+        self.coalesce_delay = coalesce_delay
         
         self.moebot = None
         self.mqtt_client = None
@@ -47,172 +119,340 @@ class MoeBotMQTT:
         # Topic paths
         self.cmnd_topic = f"{mqtt_topic}/cmnd"
         self.stats_topic = f"{mqtt_topic}/stats"
+        self._cmnd_prefix = f"{self.cmnd_topic}/"
+        self._cmnd_prefix_len = len(self._cmnd_prefix)
+        self._cmnd_filter = f"{self._cmnd_prefix}+"
+        self._stats_filter = f"{self.stats_topic}/+"
+        # Full stat topic per stat name (paho only takes str topics, so these stay str)
+        self._stat_topics = {name: f"{self.stats_topic}/{name}" for name in STAT_NAMES}
+        
+        # Command name -> handler(payload)
+        self._cmd_table = {
+            "start": self._cmd_start,
+            "pause": self._cmd_pause,
+            "cancel": self._cmd_cancel,
+            "dock": self._cmd_dock,
+            "mow_time": self._cmd_mow_time,
+            "mow_in_rain": self._cmd_mow_in_rain,
+            "poll": self._cmd_poll,
+            "get_errors": self._cmd_get_errors,
+            "get_password": self._cmd_get_password,
+        }
+        
+        # Command topic -> handler, walked once per incoming message in _on_mqtt_message
+        self._matcher = MQTTMatcher()
+        for command, handler in self._cmd_table.items():
+            self._matcher[self._cmnd_prefix + command] = handler
         
-        # Track last published values to only publish on changes
+        # Track last published payloads (as sent on the wire, bytes) to only publish on changes
         self.last_stats = {}
+        # Raw value behind each last_stats entry, so unchanged stats skip payload formatting
+        self._last_values = {}
+        
+        # Pending coalesced stats publish (see _on_moebot_update)
+        self._coalesce_lock = threading.Lock()
+        self._coalesce_timer = None
+        # Serializes stats passes (coalescing timer, command replies and poll)
+        self._publish_lock = threading.Lock()
+        # Set by the motion commands; the device update answering them skips the coalescing delay
+        self._pending_update = False
+        # Ends the retained stats read-back window opened on connect
+        self._seed_timer = None
+        # True while the window is open: stats are not published until it closes
+        self._seeding = False
+        
+        # (handler, payload) of commands received while self.moebot is None, run once it connects
+        self._held_commands = deque(maxlen=HELD_COMMANDS_MAX)
+        
+        # Runs blocking device polls off the MQTT network thread; a single worker
+        # keeps polls from overlapping on the device connection
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="moebot-poll")
         
-    def _on_mqtt_connect(self, client, userdata, flags, rc):
+    def _on_mqtt_connect(self, client, userdata, flags, reason_code, properties):
         """Handle MQTT connection"""
-        if rc == 0:
-            _log.info("Connected to MQTT broker")
-            # Subscribe to command topics
-            client.subscribe(f"{self.cmnd_topic}/#")
-            _log.info(f"Subscribed to {self.cmnd_topic}/#")
+        if not reason_code.is_failure:
+            _log.info(f"Connected to MQTT broker (session present: {flags.session_present})")
+            # A resumed session still holds the command subscription (and any commands queued meanwhile)
+            if not flags.session_present:
+                client.subscribe(self._cmnd_filter, qos=1)
+                _log.info(f"Subscribed to {self._cmnd_filter}")
+            # Publishes made while disconnected were dropped, so forget what was sent...
+            with self._publish_lock:
+                self._seeding = True
+                self.last_stats.clear()
+                self._last_values.clear()
+            # ...and seed it from the broker's retained stats instead, so values it already
+            # holds (e.g. across a restart) are not published again
+            client.subscribe(self._stats_filter)
+            if self._seed_timer is not None:
+                self._seed_timer.cancel()
+            self._seed_timer = threading.Timer(RETAINED_SEED_WINDOW, self._end_stats_seed, (client,))
+            self._seed_timer.daemon = True
+            self._seed_timer.start()
         else:
-            _log.error(f"Failed to connect to MQTT broker, rc: {rc}")
+            _log.error(f"Failed to connect to MQTT broker: {reason_code}")
+    
+    def _on_retained_stat(self, client, userdata, msg):
+        """Record a retained stat sent back by the broker as already published"""
+        if msg.retain:
+            stat_name = msg.topic[len(self.stats_topic) + 1:]
+            if stat_name in _UNRETAINED:
+                # Left over from when this stat was still retained: clear it once, as a migration
+                client.publish(msg.topic, b"", retain=True)
+                return
+            with self._publish_lock:
+                # Late arrivals after the window closed would overwrite what we published since
+                if self._seeding:
+                    self.last_stats[stat_name] = msg.payload
+    
+    def _end_stats_seed(self, client):
+        """Stop reading back stats and republish whatever differs from the broker's copy"""
+        self._seed_timer = None
+        client.unsubscribe(self._stats_filter)
+        with self._publish_lock:
+            self._seeding = False
+        # Already off the network thread; build the stats from cached device data only, so this
+        # Timer thread doesn't query the device over the socket pymoebot's listener is reading
+        if self.moebot:
+            self._publish_all_stats(refresh=False)
     
     def _on_mqtt_message(self, client, userdata, msg):
         """Handle incoming MQTT messages"""
         try:
             topic = msg.topic
-            payload = msg.payload.decode('utf-8').strip().lower()
+            # Commands are ASCII, so match on the raw bytes and skip the UTF-8 decode
+            payload = msg.payload.strip().lower()
             
-            _log.debug(f"Received MQTT message - Topic: {topic}, Payload: {payload}")
+            if _log.isEnabledFor(logging.DEBUG):
+                _log.debug("Received MQTT message - Topic: %s, Payload: %s", topic, payload.decode('utf-8', 'replace'))
             
-            # Parse command topic
-            if topic.startswith(f"{self.cmnd_topic}/"):
-                command = topic.replace(f"{self.cmnd_topic}/", "")
-                self._handle_command(command, payload)
+            # Route to the handler registered for this command topic
+            for handler in self._matcher.iter_match(topic):
+                if self.moebot is None:
+                    # Start-up or restart in progress: paho acks the message anyway, so keep
+                    # the command (e.g. one the broker queued while we were offline) for later
+                    _log.warning(f"MoeBot not connected, holding command: {topic[self._cmnd_prefix_len:]}")
+                    self._held_commands.append((handler, payload))
+                else:
+                    handler(payload)
+                break
+            else:
+                _log.warning(f"Unknown command: {topic[self._cmnd_prefix_len:]}")
                 
         except Exception as e:
-            _log.error(f"Error handling MQTT message: {e}")
+            _log.error(f"Error handling MQTT message on {msg.topic}: {e}")
     
-    def _handle_command(self, command: str, payload: str):
-        """Handle incoming MQTT commands"""
+    def _send_motion_command(self, action, **kwargs):
+        """Send a motion command; the device update answering it skips the coalescing delay"""
+        self._pending_update = True
         try:
-            if command == "start":
-                spiral = payload.lower() == "spiral"
-                _log.info(f"Starting mower (spiral={spiral})")
-                self.moebot.start(spiral=spiral)
-                self._publish_stat("state", self.moebot.state)
-                
-            elif command == "pause":
-                _log.info("Pausing mower")
-                self.moebot.pause()
-                self._publish_stat("state", self.moebot.state)
-                
-            elif command == "cancel":
-                _log.info("Canceling mower")
-                self.moebot.cancel()
-                self._publish_stat("state", self.moebot.state)
-                
-            elif command == "dock":
-                _log.info("Docking mower")
-                self.moebot.dock()
-                self._publish_stat("state", self.moebot.state)
-                
-            elif command == "mow_time":
-                try:
-                    hours = int(payload)
-                    if 1 <= hours <= 99:
-                        _log.info(f"Setting mow time to {hours} hours")
-                        self.moebot.mow_time = hours
-                        self._publish_stat("mow_time", hours)
-                    else:
-                        _log.warning(f"Mow time must be between 1-99, got {hours}")
-                except ValueError:
-                    _log.error(f"Invalid mow_time value: {payload}")
-                
-            elif command == "mow_in_rain":
-                if payload in ("true", "1", "on", "yes"):
-                    _log.info("Enabling mow in rain")
-                    self.moebot.mow_in_rain = True
-                    self._publish_stat("mow_in_rain", "true")
-                elif payload in ("false", "0", "off", "no"):
-                    _log.info("Disabling mow in rain")
-                    self.moebot.mow_in_rain = False
-                    self._publish_stat("mow_in_rain", "false")
-                else:
-                    _log.warning(f"Invalid mow_in_rain value: {payload}")
-                    
-            elif command == "poll":
-                _log.info("Polling device status")
-                self.moebot.poll()
-                self._publish_all_stats()
-                
-            elif command == "get_errors":
-                _log.info("Fetching machine errors")
-                errors = self.moebot.machine_errors
-                self._publish_stat("machine_errors", ",".join(errors) if errors else "None")
-                
-            elif command == "get_password":
-                _log.info("Fetching device password")
-                password_data = self.moebot.password
-                if password_data["numeric"]:
-                    # Publish both numeric and letter format
-                    password_str = f"{password_data['letter']}"
-                    self._publish_stat("device_password", password_str)
-                else:
-                    self._publish_stat("device_password", "Unknown")
-                
+            action(**kwargs)
+        except Exception:
+            # A rejected command gets no answering update, so don't fast-path an unrelated one
+            self._pending_update = False
+            raise
+    
+    def _cmd_start(self, payload: bytes):
+        """Start mowing (payload "spiral" for a spiral cut)"""
+        spiral = payload == b"spiral"
+        _log.info(f"Starting mower (spiral={spiral})")
+        self._send_motion_command(self.moebot.start, spiral=spiral)
+    
+    def _cmd_pause(self, payload: bytes):
+        """Pause mowing"""
+        _log.info("Pausing mower")
+        self._send_motion_command(self.moebot.pause)
+    
+    def _cmd_cancel(self, payload: bytes):
+        """Cancel the current operation"""
+        _log.info("Canceling mower")
+        self._send_motion_command(self.moebot.cancel)
+    
+    def _cmd_dock(self, payload: bytes):
+        """Return to the charging station"""
+        _log.info("Docking mower")
+        self._send_motion_command(self.moebot.dock)
+    
+    def _cmd_mow_time(self, payload: bytes):
+        """Set mow duration in hours (1-99)"""
+        try:
+            hours = int(payload)
+            if 1 <= hours <= 99:
+                _log.info(f"Setting mow time to {hours} hours")
+                self.moebot.mow_time = hours
+                # With per-field topics off, the device update refreshes stats/all instead
+                if self.per_field_topics:
+                    self._publish_stat("mow_time", hours)
             else:
-                _log.warning(f"Unknown command: {command}")
-                
+                _log.warning(f"Mow time must be between 1-99, got {hours}")
+        except ValueError:
+            _log.error(f"Invalid mow_time value: {payload.decode('utf-8', 'replace')}")
+    
+    def _cmd_mow_in_rain(self, payload: bytes):
+        """Enable or disable mowing in rain"""
+        if payload in _TRUTHY:
+            _log.info("Enabling mow in rain")
+            self.moebot.mow_in_rain = True
+            if self.per_field_topics:
+                self._publish_stat("mow_in_rain", "true")
+        elif payload in _FALSY:
+            _log.info("Disabling mow in rain")
+            self.moebot.mow_in_rain = False
+            if self.per_field_topics:
+                self._publish_stat("mow_in_rain", "false")
+        else:
+            _log.warning(f"Invalid mow_in_rain value: {payload.decode('utf-8', 'replace')}")
+    
+    def _cmd_poll(self, payload: bytes):
+        """Force a status refresh and republish all stats"""
+        _log.info("Polling device status")
+        self._executor.submit(self._do_poll)
+    
+    def _do_poll(self):
+        """Poll the device and republish all stats (runs on the poll worker)"""
+        try:
+            # The MoeBot may have been disconnected while the poll was queued
+            moebot = self.moebot
+            if moebot:
+                moebot.poll()
+                self._publish_all_stats()
         except Exception as e:
-            _log.error(f"Error handling command '{command}': {e}")
+            _log.error(f"Error polling device: {e}")
+    
+    def _cmd_get_errors(self, payload: bytes):
+        """Publish the active machine errors"""
+        _log.info("Fetching machine errors")
+        self._publish_stat("machine_errors", self._format_errors(self.moebot.machine_errors))
+    
+    def _cmd_get_password(self, payload: bytes):
+        """Publish the device PIN"""
+        _log.info("Fetching device password")
+        self._publish_stat("device_password", self._format_password(self.moebot.password))
     
     def _on_moebot_update(self, data):
         """Handle MoeBot status updates"""
         try:
-            _log.debug(f"MoeBot update received: {data}")
-            self._publish_all_stats()
+            _log.debug("MoeBot update received: %s", data)
+            publish_now = False
+            with self._coalesce_lock:
+                if self._pending_update:
+                    # The device answering a motion command: publish the new state right away
+                    self._pending_update = False
+                    publish_now = True
+                elif self._coalesce_timer is None:
+                    # Bursts of updates share one publish, scheduled by the first of them
+                    self._coalesce_timer = threading.Timer(self.coalesce_delay, self._flush_stats)
+                    self._coalesce_timer.daemon = True
+                    self._coalesce_timer.start()
+            if publish_now:
+                self._publish_all_stats()
         except Exception as e:
             _log.error(f"Error handling MoeBot update: {e}")
     
+    def _flush_stats(self):
+        """Publish stats once for all updates received since the timer was scheduled"""
+        with self._coalesce_lock:
+            self._coalesce_timer = None
+        # The MoeBot may have been disconnected while the timer was pending
+        if self.moebot:
+            self._publish_all_stats()
+    
+    @staticmethod
+    def _format_payload(value) -> bytes:
+        """Encode a stat value the way it is published on its own topic"""
+        # Built as bytes directly, so paho sends them as-is instead of encoding a str
+        cls = value.__class__
+        if cls is str:
+            return value.encode('utf-8')
+        if cls is int:
+            return b"%d" % value
+        if cls is bool:
+            return _BOOL_BYTES[value]
+        if cls is bytes:
+            return value
+        return str(value).encode('utf-8')
+    
+    @staticmethod
+    def _format_errors(errors) -> str:
+        """Format active machine errors as published on machine_errors"""
+        return ",".join(errors) if errors else "None"
+    
+    @staticmethod
+    def _format_password(password_data) -> str:
+        """Format the device PIN as published on device_password"""
+        return password_data["letter"] if password_data["numeric"] else "Unknown"
+    
     def _publish_stat(self, stat_name: str, value):
         """Publish a single stat to MQTT - only if value changed"""
-        if not self.mqtt_client:
+        # Nothing goes out while the broker's retained copies are being read back
+        if not self.mqtt_client or self._seeding:
             return
             
-        payload = str(value).lower() if isinstance(value, bool) else str(value)
+        # Fast path: same raw value (and type, so True != 1) as last time
+        last_value = self._last_values.get(stat_name, _UNSET)
+        if last_value.__class__ is value.__class__ and last_value == value:
+            return
+        
+        payload = self._format_payload(value)
+        self._last_values[stat_name] = value
         
         # Only publish if value has changed
         if self.last_stats.get(stat_name) == payload:
-            _log.debug(f"Skipped {stat_name} (unchanged: {payload})")
+            if _log.isEnabledFor(logging.DEBUG):
+                _log.debug("Skipped %s (unchanged: %s)", stat_name, payload.decode('utf-8', 'replace'))
             return
         
-        topic = f"{self.stats_topic}/{stat_name}"
-        self.mqtt_client.publish(topic, payload, retain=True)
+        topic = self._stat_topics[stat_name]
+        self.mqtt_client.publish(topic, payload, retain=stat_name not in _UNRETAINED)
         self.last_stats[stat_name] = payload
-        _log.debug(f"Published {topic} = {payload}")
+        if _log.isEnabledFor(logging.DEBUG):
+            _log.debug("Published %s = %s", topic, payload.decode('utf-8', 'replace'))
     
-    def _publish_all_stats(self):
-        """Publish all MoeBot stats to MQTT"""
+    def _collect_stats(self, refresh: bool = True) -> dict:
+        """Gather all MoeBot stats into a single dict (stat name -> value); refresh=False uses cached data only"""
+        # One bulk read of every property; also keeps a concurrent restart from swapping the client mid-pass
+        snap = self.moebot.get_snapshot() if refresh else self.moebot.get_snapshot(dps_ttl=None)
+        
+        stats = {
+            "battery": snap.battery,
+            "state": snap.state,
+            # Only publish emergency_state if machine is in EMERGENCY state, clear it otherwise
+            "emergency_state": snap.emergency_state if snap.state == "EMERGENCY" and snap.emergency_state else "",
+            "mow_in_rain": snap.mow_in_rain,
+            "mow_time": snap.mow_time,
+            "work_mode": snap.work_mode,
+            "online": snap.online,
+        }
+        
+        # Zone information
+        for (distance_name, ratio_name), (distance, ratio) in zip(_ZONE_STAT_NAMES, snap.zones):
+            stats[distance_name] = distance
+            stats[ratio_name] = ratio
+        
+        stats["machine_errors"] = self._format_errors(snap.machine_errors)
+        
+        # Device password (left out until the device has reported one)
+        if snap.password["numeric"]:
+            stats["device_password"] = self._format_password(snap.password)
+        
+        return stats
+    
+    def _publish_all_stats(self, refresh: bool = True):
+        """Publish all MoeBot stats to MQTT as one JSON document (plus per-field topics if enabled)"""
         try:
-            # Publish all properties
-            self._publish_stat("battery", self.moebot.battery)
-            self._publish_stat("state", self.moebot.state)
-            
-            # Only publish emergency_state if machine is in EMERGENCY state
-            if self.moebot.state == "EMERGENCY" and self.moebot.emergency_state:
-                self._publish_stat("emergency_state", self.moebot.emergency_state)
-            else:
-                # Clear emergency_state if not in emergency
-                self._publish_stat("emergency_state", "")
-            
-            self._publish_stat("mow_in_rain", self.moebot.mow_in_rain)
-            self._publish_stat("mow_time", self.moebot.mow_time)
-            self._publish_stat("work_mode", self.moebot.work_mode)
-            self._publish_stat("online", self.moebot.online)
-            
-            # Publish zone information
-            zones = self.moebot.zones
-            if zones:
-                for i in range(1, 6):
-                    zone = getattr(zones, f"zone{i}")
-                    distance, ratio = zone
-                    self._publish_stat(f"zone{i}_distance", distance)
-                    self._publish_stat(f"zone{i}_ratio", ratio)
-            
-            # Publish machine errors
-            errors = self.moebot.machine_errors
-            self._publish_stat("machine_errors", ",".join(errors) if errors else "None")
-            
-            # Publish device password
-            password_data = self.moebot.password
-            if password_data["numeric"]:
-                password_str = f"{password_data['letter']}"
-                self._publish_stat("device_password", password_str)
+            with self._publish_lock:
+                # Seeding from the broker; _end_stats_seed publishes once it is done
+                if self._seeding:
+                    return
+                stats = self._collect_stats(refresh)
+                
+                if self.per_field_topics:
+                    for stat_name, value in stats.items():
+                        self._publish_stat(stat_name, value)
+                
+                # One retained message carrying every stat; change detection on the
+                # serialized document means it is only sent when something differs
+                self._publish_stat("all", json.dumps(stats, separators=_JSON_SEPARATORS))
             
             _log.debug("Published all stats to MQTT")
             
@@ -225,35 +465,40 @@ class MoeBotMQTT:
         try:
             _log.info("Starting MoeBot MQTT bridge")
             
-            # Initialize MQTT client
-            self.mqtt_client = mqtt.Client()
+            # Initialize MQTT client (stable client id per device, so the broker can resume our session)
+            self.mqtt_client = mqtt.Client(
+                mqtt.CallbackAPIVersion.VERSION2,
+                client_id=f"moebot-{self.device_id}",
+                protocol=mqtt.MQTTv5,
+            )
+            self.mqtt_client.enable_logger(_log)
             self.mqtt_client.on_connect = self._on_mqtt_connect
             self.mqtt_client.on_message = self._on_mqtt_message
+            self.mqtt_client.message_callback_add(self._stats_filter, self._on_retained_stat)
             
             # Set credentials if provided
             if self.mqtt_username and self.mqtt_password:
                 self.mqtt_client.username_pw_set(self.mqtt_username, self.mqtt_password)
             
-            # Connect to MQTT broker with retry
-            _log.info(f"Connecting to MQTT broker at {self.mqtt_host}:{self.mqtt_port}")
-            import time
-            while True:
-                try:
-                    self.mqtt_client.connect(self.mqtt_host, self.mqtt_port, keepalive=120)
-                    break
-                except Exception as e:
-                    _log.warning(f"MQTT connection failed: {e}. Retrying in 5s...")
-                    time.sleep(5)
-
-            self.mqtt_client.loop_start()
-            
-            # Connect to MoeBot (try once, but don't fail)
+            # Connect to MoeBot first (try once, but don't fail), so commands the broker
+            # replays from our persistent session on connect find a device to run on
             try:
                 self._connect_moebot()
             except Exception as e:
                 _log.error(f"Initial MoeBot connection failed: {e}. Supervisor will retry.")
                 self.moebot = None
             
+            # Connect to MQTT broker in the background: the loop_start() thread runs
+            # loop_forever(retry_first_connection=True), retrying with exponential backoff
+            # (1s .. 30s) both for the first connect and after a drop
+            _log.info(f"Connecting to MQTT broker at {self.mqtt_host}:{self.mqtt_port}")
+            connect_properties = Properties(PacketTypes.CONNECT)
+            connect_properties.SessionExpiryInterval = MQTT_SESSION_EXPIRY
+            self.mqtt_client.reconnect_delay_set(min_delay=1, max_delay=30)
+            self.mqtt_client.connect_async(self.mqtt_host, self.mqtt_port, keepalive=120,
+                                           clean_start=False, properties=connect_properties)
+            self.mqtt_client.loop_start()
+            
             # Start supervisor
             self.running = True
             self._start_supervisor()
@@ -269,13 +514,10 @@ class MoeBotMQTT:
         """Initialize and connect to MoeBot"""
         _log.info("Connecting to MoeBot...")
         
-        # Suppress stderr for initialization
-        save_stderr = sys.stderr
-        sys.stderr = open(os.devnull, 'w')
-        
         try:
-            # Initialize MoeBot Client
-            self.moebot = MoeBotClient(self.device_id, self.device_ip, self.local_key)
+            # Suppress the library's stderr noise while probing protocol versions
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stderr(devnull):
+                self.moebot = MoeBotClient(self.device_id, self.device_ip, self.local_key)
             self.moebot.add_listener(self._on_moebot_update)
             
             # Start MoeBot listener
@@ -296,12 +538,18 @@ class MoeBotMQTT:
                 
             _log.error(f"Failed to connect to MoeBot: {e}")
             raise
-        finally:
-            sys.stderr.close()
-            sys.stderr = save_stderr
         
-        # Log success explicitly now that stderr is restored
         _log.info(f"Successfully connected to MoeBot at {self.device_ip}")
+        self._run_held_commands()
+    
+    def _run_held_commands(self):
+        """Run the commands that arrived while no MoeBot was connected, oldest first"""
+        while self._held_commands:
+            handler, payload = self._held_commands.popleft()
+            try:
+                handler(payload)
+            except Exception as e:
+                _log.error(f"Error running held command: {e}")
 
     def _disconnect_moebot(self):
         """Disconnect from MoeBot"""
@@ -313,15 +561,11 @@ class MoeBotMQTT:
                 _log.error(f"Error disconnecting MoeBot: {e}")
             finally:
                 self.moebot = None
-                # Explicitly call garbage collector to free up resources
-                import gc
-                gc.collect()
 
     def _restart_moebot(self):
         """Restart MoeBot connection"""
         _log.warning("Restarting MoeBot connection...")
         self._disconnect_moebot()
-        import time
         time.sleep(2) # Give it a moment to clear sockets
         try:
             self._connect_moebot()
@@ -331,7 +575,6 @@ class MoeBotMQTT:
 
     def _start_supervisor(self):
         """Start the supervisor thread"""
-        import threading
         self._supervisor_stop_event = threading.Event()
         self._supervisor_thread = threading.Thread(target=self._supervisor_loop, name="SupervisorFromMqttHandler")
         self._supervisor_thread.daemon = True
@@ -340,20 +583,16 @@ class MoeBotMQTT:
     def _supervisor_loop(self):
         """Watchdog loop to monitor connection health"""
         _log.info("Supervisor watchdog started")
-        import time
-        import gc
-        
-        last_gc_time = time.time()
         
         while self.running and not self._supervisor_stop_event.is_set():
             try:
-                current_time = time.time()
+                current_time = time.monotonic()
                 
                 # Check 0: Not connected at all?
                 if self.moebot is None:
                      _log.warning("Watchdog: MoeBot not connected. Attempting to connect...")
                      self._restart_moebot()
-                     time.sleep(10) # Wait a bit after restart attempt
+                     self._supervisor_stop_event.wait(10) # Wait a bit after restart attempt
                      continue
 
                 # Check 1: Listener Thread Health
@@ -367,26 +606,21 @@ class MoeBotMQTT:
                 # Check 2: Stale Data (Last Update > 60s)
                 # Only check if we have a moebot instance
                 if self.moebot:
-                    last_update = self.moebot.last_update
-                    # last_update is a timestamp or None
-                    if last_update:
+                    # Local monotonic receive time (or None): immune to wall-clock steps and device clock skew
+                    last_update = self.moebot.last_update_monotonic
+                    if last_update is not None:
                         time_since_update = current_time - last_update
                         if time_since_update > 60:
                              _log.warning(f"Watchdog: No updates for {int(time_since_update)}s. Restarting...")
                              self._restart_moebot()
                              continue
                 
-                # Maintenance: Periodic GC every 15 minutes
-                if current_time - last_gc_time > 900:
-                    _log.debug("Running periodic garbage collection...")
-                    gc.collect()
-                    last_gc_time = current_time
-                
-                time.sleep(10)
+                # Sleep until the next check, waking immediately if stop() is called
+                self._supervisor_stop_event.wait(10)
                 
             except Exception as e:
                 _log.error(f"Error in supervisor loop: {e}")
-                time.sleep(5)
+                self._supervisor_stop_event.wait(5)
 
     def stop(self):
         """Stop MQTT bridge"""
@@ -400,11 +634,23 @@ class MoeBotMQTT:
             if hasattr(self, '_supervisor_thread'):
                 self._supervisor_thread.join(timeout=2.0)
 
+            # Drop a pending stats read-back and coalesced publish
+            if self._seed_timer is not None:
+                self._seed_timer.cancel()
+            with self._coalesce_lock:
+                timer, self._coalesce_timer = self._coalesce_timer, None
+            if timer is not None:
+                timer.cancel()
+
+            # Queued polls are dropped; one already running finishes on its own
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            
             self._disconnect_moebot()
             
+            # Disconnect first so the network thread sends DISCONNECT before it exits
             if self.mqtt_client:
-                self.mqtt_client.loop_stop()
                 self.mqtt_client.disconnect()
+                self.mqtt_client.loop_stop()
             
             _log.info("MoeBot MQTT bridge stopped")
             
@@ -450,7 +696,6 @@ if __name__ == "__main__":
         bridge.start()
         print("MQTT bridge running. Press Ctrl+C to stop.")
         # Keep the script running
-        import time
         while True:
             time.sleep(1)
     except KeyboardInterrupt: